@@ -1,19 +1,41 @@
 """Flask application factory and initialization."""
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
 
 # Initialize extensions
 db = SQLAlchemy()
 
+# Engine options that only apply to a real connection pool
+_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_use_lifo')
+
 
 def create_app(config_object='config.Config'):
     """Create and configure the Flask application."""
     app = Flask(__name__)
     app.config.from_object(config_object)
     
+    # In-memory SQLite gets a StaticPool, which rejects pool sizing options.
+    # Checked on the final config so subclasses overriding the URI are covered.
+    database_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if database_url.get_backend_name() == 'sqlite' and database_url.database in (None, '', ':memory:'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            key: value for key, value in app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+            if key not in _POOL_OPTIONS
+        }
+    
     # Initialize extensions with app
     db.init_app(app)
     
+    # Flag lazy-load N+1 queries during development
+    if app.config.get('NPLUSONE_ENABLED'):
+        from nplusone.ext.flask_sqlalchemy import NPlusOne
+        NPlusOne(app)
+    
+    # Load the workout program once and share it across requests
+    from app.utils.program_loader import ProgramLoader
+    app.extensions['program_loader'] = ProgramLoader(app.config['PROGRAM_JSON_PATH'])
+    
     # Register blueprints
     from app.routes import auth, workout, coach, main
     app.register_blueprint(auth.bp)
@@ -21,8 +43,60 @@ def create_app(config_object='config.Config'):
     app.register_blueprint(coach.bp)
     app.register_blueprint(main.bp)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Per-endpoint timing in development (must wrap already-registered routes)
+    if app.config.get('PROFILER_ENABLED'):
+        basic_auth = app.config['FLASK_PROFILER']['basicAuth']
+        if not basic_auth.get('username') or not basic_auth.get('password'):
+            raise RuntimeError('PROFILER_ENABLED requires PROFILER_USERNAME and PROFILER_PASSWORD to be set.')
+        
+        # Called directly: the Profiler wrapper defers to before_first_request, removed in Flask 2.3
+        import flask_profiler
+        flask_profiler.init_app(app)
+        _scrub_profiler_cookies()
+    
+    # Create database tables (disable once the schema is managed elsewhere)
+    if app.config.get('AUTO_CREATE_TABLES'):
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
     
     return app
+
+
+def _scrub_profiler_cookies():
+    """Drop the Cookie header from profiler measurements before they are stored."""
+    from importlib import import_module
+    
+    # Replaying a stored session cookie would log in as that user
+    collection = import_module('flask_profiler.flask_profiler').collection
+    insert = collection.insert
+    
+    def insert_without_cookies(measurement):
+        measurement.get('context', {}).get('headers', {}).pop('Cookie', None)
+        return insert(measurement)
+    
+    collection.insert = insert_without_cookies
+
+
+def upgrade_schema():
+    """
+    Bring a database created by an older release up to the current schema.
+    
+    db.create_all() only creates missing tables, so columns and indexes added
+    to existing tables since then are applied here. See "Upgrading" in the README.
+    """
+    from app.models import WorkoutLog
+    
+    inspector = db.inspect(db.engine)
+    columns = {column['name'] for column in inspector.get_columns('workout_logs')}
+    indexes = {index['name'] for index in inspector.get_indexes('workout_logs')}
+    with db.engine.begin() as connection:
+        if 'exercise_stats' not in columns:
+            connection.execute(db.text('ALTER TABLE workout_logs ADD COLUMN exercise_stats JSON'))
+        
+        # Superseded by ix_workout_logs_user_date
+        if 'ix_workout_logs_user_id' in indexes:
+            connection.execute(db.text('DROP INDEX ix_workout_logs_user_id'))
+        
+        for index in WorkoutLog.__table__.indexes:
+            index.create(connection, checkfirst=True)
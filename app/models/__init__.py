@@ -1,8 +1,14 @@
 """Database models for the workout tracker application."""
 from datetime import datetime
+from sqlalchemy.orm import validates
 from app import db
 import secrets
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from werkzeug.security import check_password_hash
+
+# Argon2id tuned to the OWASP 46 MiB / t=1 profile (t=2 for extra margin)
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=46 * 1024, parallelism=1)
 
 
 class User(db.Model):
@@ -14,7 +20,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     
     # Share token for coach view
     share_token = db.Column(db.String(32), unique=True, nullable=False, default=lambda: secrets.token_urlsafe(24))
@@ -22,13 +28,37 @@ class User(db.Model):
     # Relationships
     workout_logs = db.relationship('WorkoutLog', backref='user', lazy=True, cascade='all, delete-orphan')
     
+    @validates('email')
+    def validate_email(self, key, email):
+        """Store emails trimmed and lower-cased so exact lookups are case-insensitive."""
+        return email.strip().lower()
+    
     def set_password(self, password):
-        """Set the user's password (hashed)."""
-        self.password_hash = generate_password_hash(password)
+        """Set the user's password (hashed with Argon2id)."""
+        self.password_hash = _password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check if the provided password is correct."""
-        return check_password_hash(self.password_hash, password)
+        """
+        Check if the provided password is correct.
+        
+        Legacy Werkzeug (scrypt/PBKDF2) hashes and Argon2 hashes with outdated
+        parameters are upgraded in place on a successful check; the caller
+        is responsible for committing the change.
+        """
+        if not self.password_hash.startswith('$argon2'):
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        
+        try:
+            _password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        if _password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -38,15 +68,22 @@ class WorkoutLog(db.Model):
     """Model for logging complete workouts."""
     
     __tablename__ = 'workout_logs'
+    __table_args__ = (
+        # Serves "latest workouts for a user" without a sort; also covers user_id lookups
+        db.Index('ix_workout_logs_user_date', 'user_id', db.desc('date')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False, server_default=db.func.current_date())
     workout_name = db.Column(db.String(100), nullable=False)
     week_number = db.Column(db.Integer, nullable=False)  # Week in cycle (1-4 for 3+1)
     split = db.Column(db.String(1), nullable=False)  # 'A' or 'B'
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+    
+    # Per-exercise aggregates computed when the workout is logged (see WorkoutCalculator.summarize_sets)
+    exercise_stats = db.Column(db.JSON)  # {exercise: {total_volume, total_sets, total_reps, best_estimated_1rm}}
     
     # Relationships
     sets = db.relationship('SetLog', backref='workout', lazy=True, cascade='all, delete-orphan')
@@ -67,7 +104,7 @@ class SetLog(db.Model):
     reps = db.Column(db.Integer, nullable=False)
     weight = db.Column(db.Float, nullable=False)
     rpe = db.Column(db.Float)  # Rate of Perceived Exertion (1-10)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     
     def __repr__(self):
         return f'<SetLog {self.exercise_name} - Set {self.set_number}>'
@@ -1,5 +1,6 @@
 """Coach view routes for read-only access via shareable links."""
-from flask import Blueprint, render_template, abort
+from flask import Blueprint, render_template
+from sqlalchemy.orm import load_only, selectinload
 from app.models import User, WorkoutLog
 from app.utils.calculations import WorkoutCalculator
 
@@ -10,17 +11,18 @@ bp = Blueprint('coach', __name__, url_prefix='/coach')
 def view(token):
     """Read-only coach view accessible via shareable token."""
     # Find user by share token
-    user = User.query.filter_by(share_token=token).first()
-    
-    if not user:
-        abort(404)
+    user = User.query.filter_by(share_token=token).first_or_404()
     
     # Get weekly statistics
-    weekly_volume = WorkoutCalculator.get_weekly_volume(user.id, weeks_back=1)
-    best_1rms = WorkoutCalculator.get_best_estimated_1rm(user.id, weeks_back=4)
+    weekly_volume, best_1rms = WorkoutCalculator.get_exercise_stats(
+        user.id, volume_weeks_back=1, one_rm_weeks_back=4
+    )
     
     # Get recent workouts
-    recent_workouts = WorkoutLog.query.filter_by(user_id=user.id).order_by(
+    recent_workouts = WorkoutLog.query.options(load_only(
+        WorkoutLog.id, WorkoutLog.date, WorkoutLog.workout_name, WorkoutLog.week_number,
+        WorkoutLog.split, WorkoutLog.notes
+    )).filter_by(user_id=user.id).order_by(
         WorkoutLog.date.desc()
     ).limit(10).all()
     
@@ -36,14 +38,11 @@ def view(token):
 @bp.route('/workout/<token>/<int:workout_id>')
 def view_workout(token, workout_id):
     """View details of a specific workout in coach view."""
-    # Find user by share token
-    user = User.query.filter_by(share_token=token).first()
-    
-    if not user:
-        abort(404)
-    
-    # Get workout (must belong to this user)
-    workout = WorkoutLog.query.filter_by(id=workout_id, user_id=user.id).first_or_404()
-    summary = WorkoutCalculator.get_workout_summary(workout_id)
+    # Get workout, resolving the share token in the same query
+    workout = WorkoutLog.query.join(User).filter(
+        User.share_token == token,
+        WorkoutLog.id == workout_id
+    ).options(selectinload(WorkoutLog.sets)).first_or_404()
+    summary = WorkoutCalculator.get_workout_summary(workout)
     
     return render_template('coach/workout.html', summary=summary, token=token)
@@ -1,40 +1,48 @@
 """Workout tracking routes."""
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app, abort
+import re
+from collections import defaultdict
 from datetime import datetime
+from sqlalchemy.orm import load_only, selectinload
 from app import db
 from app.models import User, WorkoutLog, SetLog
 from app.routes.main import login_required
-from app.utils.program_loader import ProgramLoader
 from app.utils.calculations import WorkoutCalculator
+from app.utils.program_loader import get_program_loader
 
 bp = Blueprint('workout', __name__, url_prefix='/workout')
 
+# Matches exercise_<i>_name and exercise_<i>_set_<j>_<reps|weight|rpe> form keys
+_EXERCISE_FIELD_RE = re.compile(r'^exercise_(\d+)_(?:name|set_(\d+)_(reps|weight|rpe))$')
+
 
 @bp.route('/dashboard')
 @login_required
 def dashboard():
     """Display user's workout dashboard."""
     user_id = session.get('user_id')
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
     
     # Load program
-    program_path = current_app.config['PROGRAM_JSON_PATH']
-    program_loader = ProgramLoader(program_path)
+    program_loader = get_program_loader(current_app)
     
     # Get today's workout plan
     today_workout = program_loader.get_today_workout()
     
     # Get weekly statistics
-    weekly_volume = WorkoutCalculator.get_weekly_volume(user_id, weeks_back=1)
-    best_1rms = WorkoutCalculator.get_best_estimated_1rm(user_id, weeks_back=4)
+    weekly_volume, best_1rms = WorkoutCalculator.get_exercise_stats(
+        user_id, volume_weeks_back=1, one_rm_weeks_back=4
+    )
     
     # Get recent workouts
-    recent_workouts = WorkoutLog.query.filter_by(user_id=user_id).order_by(
+    recent_workouts = WorkoutLog.query.options(load_only(
+        WorkoutLog.id, WorkoutLog.date, WorkoutLog.workout_name, WorkoutLog.week_number, WorkoutLog.split
+    )).filter_by(user_id=user_id).order_by(
         WorkoutLog.date.desc()
     ).limit(5).all()
     
-    # Generate share link for coach view
-    share_url = url_for('coach.view', token=user.share_token, _external=True)
+    # Generate share link for coach view; the page prefixes it with its own origin
+    share_path = url_for('coach.view', token=user.share_token)
     
     return render_template(
         'workout/dashboard.html',
@@ -43,7 +51,7 @@ def dashboard():
         weekly_volume=weekly_volume,
         best_1rms=best_1rms,
         recent_workouts=recent_workouts,
-        share_url=share_url
+        share_path=share_path
     )
 
 
@@ -79,54 +87,53 @@ def log_workout():
         db.session.add(workout_log)
         db.session.flush()  # Get the ID
         
-        # Parse and add sets
-        set_count = 0
-        for key in request.form:
-            if key.startswith('exercise_'):
-                parts = key.split('_')
-                if len(parts) >= 3:
-                    exercise_idx = parts[1]
-                    field = parts[2]
-                    
-                    if field == 'name':
-                        exercise_name = request.form.get(key)
-                        
-                        # Get all sets for this exercise
-                        set_idx = 0
-                        while True:
-                            reps_key = f'exercise_{exercise_idx}_set_{set_idx}_reps'
-                            weight_key = f'exercise_{exercise_idx}_set_{set_idx}_weight'
-                            rpe_key = f'exercise_{exercise_idx}_set_{set_idx}_rpe'
-                            
-                            if reps_key not in request.form:
-                                break
-                            
-                            reps = request.form.get(reps_key)
-                            weight = request.form.get(weight_key)
-                            rpe = request.form.get(rpe_key)
-                            
-                            if reps and weight:
-                                set_log = SetLog(
-                                    workout_log_id=workout_log.id,
-                                    exercise_name=exercise_name,
-                                    set_number=set_idx + 1,
-                                    reps=int(reps),
-                                    weight=float(weight),
-                                    rpe=float(rpe) if rpe else None
-                                )
-                                db.session.add(set_log)
-                                set_count += 1
-                            
-                            set_idx += 1
+        # Bucket exercise fields in a single pass over the form
+        exercises = defaultdict(lambda: {'name': None, 'sets': defaultdict(dict)})
+        for key, value in request.form.items():
+            match = _EXERCISE_FIELD_RE.match(key)
+            if not match:
+                continue
+            exercise_idx, set_idx, field = match.groups()
+            if set_idx is None:
+                exercises[int(exercise_idx)]['name'] = value
+            else:
+                exercises[int(exercise_idx)]['sets'][int(set_idx)][field] = value
+        
+        # Flatten into rows, then insert them in a single executemany round trip
+        set_rows = []
+        for exercise in exercises.values():
+            if exercise['name'] is None:
+                continue
+            for set_idx in sorted(exercise['sets']):
+                fields = exercise['sets'][set_idx]
+                reps = fields.get('reps')
+                weight = fields.get('weight')
+                rpe = fields.get('rpe')
+                
+                if reps and weight:
+                    set_rows.append({
+                        'workout_log_id': workout_log.id,
+                        'exercise_name': exercise['name'],
+                        'set_number': set_idx + 1,
+                        'reps': int(reps),
+                        'weight': float(weight),
+                        'rpe': float(rpe) if rpe else None
+                    })
+        
+        if set_rows:
+            db.session.execute(SetLog.__table__.insert(), set_rows)
         
+        # Store per-workout aggregates so dashboards need not rescan the sets
+        workout_log.exercise_stats = WorkoutCalculator.summarize_sets(
+            (row['exercise_name'], row['reps'], row['weight'], row['rpe']) for row in set_rows
+        )
         db.session.commit()
         
-        flash(f'Workout logged successfully! ({set_count} sets recorded)', 'success')
+        flash(f'Workout logged successfully! ({len(set_rows)} sets recorded)', 'success')
         return redirect(url_for('workout.dashboard'))
     
     # GET request - show form
-    program_path = current_app.config['PROGRAM_JSON_PATH']
-    program_loader = ProgramLoader(program_path)
+    program_loader = get_program_loader(current_app)
     today_workout = program_loader.get_today_workout()
     today_date = datetime.utcnow().date().isoformat()
     
@@ -139,8 +146,14 @@ def history():
     """View workout history."""
     user_id = session.get('user_id')
     
-    # Get all workouts for user
-    workouts = WorkoutLog.query.filter_by(user_id=user_id).order_by(
+    # Get all workouts for user (sets are eager-loaded for the per-workout counts)
+    workouts = WorkoutLog.query.options(
+        load_only(
+            WorkoutLog.id, WorkoutLog.date, WorkoutLog.workout_name, WorkoutLog.week_number,
+            WorkoutLog.split, WorkoutLog.notes
+        ),
+        selectinload(WorkoutLog.sets)
+    ).filter_by(user_id=user_id).order_by(
         WorkoutLog.date.desc()
     ).all()
     
@@ -153,8 +166,13 @@ def view_workout(workout_id):
     """View details of a specific workout."""
     user_id = session.get('user_id')
     
-    workout = WorkoutLog.query.filter_by(id=workout_id, user_id=user_id).first_or_404()
-    summary = WorkoutCalculator.get_workout_summary(workout_id)
+    workout = db.session.get(
+        WorkoutLog, workout_id, options=[selectinload(WorkoutLog.sets)]
+    )
+    if workout is None or workout.user_id != user_id:
+        abort(404)
+    
+    summary = WorkoutCalculator.get_workout_summary(workout)
     
     return render_template('workout/view.html', summary=summary)
 
@@ -163,8 +181,7 @@ def view_workout(workout_id):
 @login_required
 def api_program():
     """API endpoint to get program information."""
-    program_path = current_app.config['PROGRAM_JSON_PATH']
-    program_loader = ProgramLoader(program_path)
+    program_loader = get_program_loader(current_app)
     
     split = request.args.get('split', 'A')
     week = int(request.args.get('week', 1))
@@ -21,6 +21,9 @@ class AuthHelper:
         user = User.query.filter_by(email=email).first()
         
         if user and user.check_password(password):
+            # Persist a hash upgraded during the password check
+            if db.session.is_modified(user):
+                db.session.commit()
             return user
         
         return None
@@ -1,10 +1,57 @@
 """Utility module for workout calculations (volume, 1RM estimates, etc.)."""
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import case, func
+from sqlalchemy.orm import load_only
 from app import db
 from app.models import WorkoutLog, SetLog
 
 
+# One set in a workout summary; templates read it by attribute like the old dict
+_SetRow = namedtuple('_SetRow', ['set_number', 'reps', 'weight', 'rpe'])
+
+
+def _estimated_1rm_expr():
+    """SQL expression mirroring WorkoutCalculator.estimate_1rm for a SetLog row."""
+    rpe_adjustment = 1.0 + (10 - func.coalesce(SetLog.rpe, 10)) * 0.025
+    return case(
+        (SetLog.reps == 1, SetLog.weight),
+        else_=SetLog.weight * (1 + SetLog.reps / 30.0) * rpe_adjustment
+    )
+
+
+def _set_stats_by_workout(workout_ids):
+    """
+    Aggregate SetLog rows per workout and exercise in one grouped query.
+    
+    Used for workouts logged before WorkoutLog.exercise_stats was stored;
+    returns {workout_id: exercise_stats} shaped like that column.
+    """
+    stats_by_workout = defaultdict(dict)
+    if not workout_ids:
+        return stats_by_workout
+    
+    rows = db.session.query(
+        SetLog.workout_log_id,
+        SetLog.exercise_name,
+        func.sum(SetLog.reps * SetLog.weight),
+        func.count(SetLog.id),
+        func.sum(SetLog.reps),
+        func.max(_estimated_1rm_expr())
+    ).filter(
+        SetLog.workout_log_id.in_(workout_ids)
+    ).group_by(SetLog.workout_log_id, SetLog.exercise_name)
+    
+    for workout_id, exercise, volume, set_count, reps, best_1rm in rows:
+        stats_by_workout[workout_id][exercise] = {
+            'total_volume': volume,
+            'total_sets': set_count,
+            'total_reps': reps,
+            'best_estimated_1rm': round(best_1rm, 2)
+        }
+    return stats_by_workout
+
+
 class WorkoutCalculator:
     """Perform calculations on workout data."""
     
@@ -24,72 +71,101 @@ class WorkoutCalculator:
         if reps == 1:
             return weight
         
-        # Epley formula: 1RM = weight * (1 + reps/30)
-        estimated_1rm = weight * (1 + reps / 30.0)
+        # Missing RPE counts as maximal effort, which makes the adjustment 1.0
+        # RPE 10 = maximal effort, RPE 7 = 3 reps in reserve
+        rpe = 10 if rpe is None else rpe
         
-        # Adjust based on RPE if provided
-        if rpe is not None:
-            # RPE 10 = maximal effort, RPE 7 = 3 reps in reserve
-            # Adjust the estimate based on perceived difficulty
-            rpe_adjustment = 1.0 + (10 - rpe) * 0.025
-            estimated_1rm *= rpe_adjustment
+        # Epley formula: 1RM = weight * (1 + reps/30), adjusted for perceived difficulty
+        estimated_1rm = weight * (1 + reps / 30.0) * (1.0 + (10 - rpe) * 0.025)
         
         return round(estimated_1rm, 2)
     
     @staticmethod
-    def calculate_volume(sets_query):
+    def summarize_sets(sets):
         """
-        Calculate total volume (sets × reps × weight) from a query of sets.
+        Aggregate a workout's sets for storage on its WorkoutLog.
         
         Args:
-            sets_query: SQLAlchemy query result of SetLog objects
+            sets: Iterable of (exercise_name, reps, weight, rpe) tuples
         
         Returns:
-            float: Total volume
+            dict: Stats by exercise, matching the WorkoutLog.exercise_stats column
         """
-        total_volume = 0
-        for set_log in sets_query:
-            total_volume += set_log.reps * set_log.weight
-        return round(total_volume, 2)
+        exercise_stats = defaultdict(lambda: {
+            'total_volume': 0,
+            'total_sets': 0,
+            'total_reps': 0,
+            'best_estimated_1rm': 0
+        })
+        estimate_1rm = WorkoutCalculator.estimate_1rm
+        for exercise, reps, weight, rpe in sets:
+            volume = reps * weight
+            estimated_1rm = estimate_1rm(weight, reps, rpe)
+            
+            stats = exercise_stats[exercise]
+            stats['total_volume'] += volume
+            stats['total_sets'] += 1
+            stats['total_reps'] += reps
+            if estimated_1rm > stats['best_estimated_1rm']:
+                stats['best_estimated_1rm'] = estimated_1rm
+        
+        return dict(exercise_stats)
     
     @staticmethod
-    def get_weekly_volume(user_id, weeks_back=1):
+    def get_exercise_stats(user_id, volume_weeks_back=1, one_rm_weeks_back=4):
         """
-        Get weekly volume statistics for a user.
+        Get weekly volume and best estimated 1RM per exercise.
+        
+        Reads the aggregates stored on each WorkoutLog rather than scanning
+        SetLog rows; workouts logged before those were stored are aggregated
+        from their sets in a single grouped query.
         
         Args:
             user_id: User ID
-            weeks_back: Number of weeks to look back
+            volume_weeks_back: Number of weeks to look back for volume
+            one_rm_weeks_back: Number of weeks to look back for 1RM
         
         Returns:
-            dict: Weekly volume by exercise
+            tuple: (weekly volume by exercise as {total_volume, total_sets,
+                total_reps}, best estimated 1RM by exercise)
         """
         end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(weeks=weeks_back)
+        volume_start = end_date - timedelta(weeks=volume_weeks_back)
+        one_rm_start = end_date - timedelta(weeks=one_rm_weeks_back)
         
-        # Query sets for the date range
-        sets = SetLog.query.join(WorkoutLog).filter(
+        workouts = WorkoutLog.query.options(
+            load_only(WorkoutLog.id, WorkoutLog.date, WorkoutLog.exercise_stats)
+        ).filter(
             WorkoutLog.user_id == user_id,
-            WorkoutLog.date >= start_date,
+            WorkoutLog.date >= min(volume_start, one_rm_start),
             WorkoutLog.date <= end_date
         ).all()
         
-        # Group by exercise and calculate volume
-        exercise_volumes = {}
-        for set_log in sets:
-            exercise = set_log.exercise_name
-            volume = set_log.reps * set_log.weight
-            
-            if exercise not in exercise_volumes:
-                exercise_volumes[exercise] = {
-                    'total_volume': 0,
-                    'total_sets': 0,
-                    'total_reps': 0
-                }
+        exercise_volumes = defaultdict(lambda: {
+            'total_volume': 0,
+            'total_sets': 0,
+            'total_reps': 0
+        })
+        exercise_1rms = {}
+        legacy_stats = _set_stats_by_workout(
+            [workout.id for workout in workouts if workout.exercise_stats is None]
+        )
+        for workout in workouts:
+            exercise_stats = workout.exercise_stats
+            if exercise_stats is None:
+                exercise_stats = legacy_stats[workout.id]
             
-            exercise_volumes[exercise]['total_volume'] += volume
-            exercise_volumes[exercise]['total_sets'] += 1
-            exercise_volumes[exercise]['total_reps'] += set_log.reps
+            for exercise, stats in exercise_stats.items():
+                if workout.date >= volume_start:
+                    volumes = exercise_volumes[exercise]
+                    volumes['total_volume'] += stats['total_volume']
+                    volumes['total_sets'] += stats['total_sets']
+                    volumes['total_reps'] += stats['total_reps']
+                
+                if workout.date >= one_rm_start:
+                    best_1rm = stats['best_estimated_1rm']
+                    if exercise not in exercise_1rms or best_1rm > exercise_1rms[exercise]:
+                        exercise_1rms[exercise] = best_1rm
         
         # Round volumes
         for exercise in exercise_volumes:
@@ -97,99 +173,43 @@ class WorkoutCalculator:
                 exercise_volumes[exercise]['total_volume'], 2
             )
         
-        return exercise_volumes
-    
-    @staticmethod
-    def get_best_estimated_1rm(user_id, exercise_name=None, weeks_back=4):
-        """
-        Get the best estimated 1RM for exercises.
-        
-        Args:
-            user_id: User ID
-            exercise_name: Specific exercise name (optional)
-            weeks_back: Number of weeks to look back
-        
-        Returns:
-            dict: Best estimated 1RM by exercise
-        """
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(weeks=weeks_back)
-        
-        # Query sets for the date range
-        query = SetLog.query.join(WorkoutLog).filter(
-            WorkoutLog.user_id == user_id,
-            WorkoutLog.date >= start_date,
-            WorkoutLog.date <= end_date
-        )
-        
-        if exercise_name:
-            query = query.filter(SetLog.exercise_name == exercise_name)
-        
-        sets = query.all()
-        
-        # Calculate 1RM for each set and keep the best per exercise
-        exercise_1rms = {}
-        for set_log in sets:
-            exercise = set_log.exercise_name
-            estimated_1rm = WorkoutCalculator.estimate_1rm(
-                set_log.weight, 
-                set_log.reps, 
-                set_log.rpe
-            )
-            
-            if exercise not in exercise_1rms or estimated_1rm > exercise_1rms[exercise]:
-                exercise_1rms[exercise] = estimated_1rm
-        
-        return exercise_1rms
+        return dict(exercise_volumes), exercise_1rms
     
     @staticmethod
-    def get_workout_summary(workout_log_id):
+    def get_workout_summary(workout):
         """
         Get a summary of a specific workout.
         
         Args:
-            workout_log_id: WorkoutLog ID
+            workout: WorkoutLog, loaded with selectinload(WorkoutLog.sets)
         
         Returns:
             dict: Workout summary with volume and best sets
         """
-        workout = WorkoutLog.query.get(workout_log_id)
-        if not workout:
-            return None
-        
-        sets = SetLog.query.filter_by(workout_log_id=workout_log_id).all()
-        
-        total_volume = WorkoutCalculator.calculate_volume(sets)
-        
-        # Group by exercise
-        exercise_data = {}
-        for set_log in sets:
+        # Group by exercise, accumulating the total volume in the same pass
+        total_volume = 0
+        exercise_data = defaultdict(lambda: {
+            'sets': [],
+            'total_volume': 0,
+            'best_estimated_1rm': 0
+        })
+        estimate_1rm = WorkoutCalculator.estimate_1rm
+        for set_log in workout.sets:
             exercise = set_log.exercise_name
-            if exercise not in exercise_data:
-                exercise_data[exercise] = {
-                    'sets': [],
-                    'total_volume': 0,
-                    'best_estimated_1rm': 0
-                }
-            
-            exercise_data[exercise]['sets'].append({
-                'set_number': set_log.set_number,
-                'reps': set_log.reps,
-                'weight': set_log.weight,
-                'rpe': set_log.rpe
-            })
+            exercise_data[exercise]['sets'].append(_SetRow(
+                set_log.set_number, set_log.reps, set_log.weight, set_log.rpe
+            ))
             
             volume = set_log.reps * set_log.weight
             exercise_data[exercise]['total_volume'] += volume
+            total_volume += volume
             
-            estimated_1rm = WorkoutCalculator.estimate_1rm(
-                set_log.weight, set_log.reps, set_log.rpe
-            )
+            estimated_1rm = estimate_1rm(set_log.weight, set_log.reps, set_log.rpe)
             if estimated_1rm > exercise_data[exercise]['best_estimated_1rm']:
                 exercise_data[exercise]['best_estimated_1rm'] = estimated_1rm
         
         return {
             'workout': workout,
-            'total_volume': total_volume,
-            'exercises': exercise_data
+            'total_volume': round(total_volume, 2),
+            'exercises': dict(exercise_data)
         }
@@ -1,6 +1,20 @@
 """Utility module for loading and processing workout programs from JSON."""
 import json
+import logging
+import os
 from datetime import datetime
+from functools import lru_cache
+from werkzeug.utils import cached_property
+
+try:
+    import orjson
+except ImportError:  # Optional faster parser; fall back to the standard library
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Schedule keys are English day names, indexed by date.weekday()
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
 
 
 def _value_for_week(values, week_in_cycle):
@@ -12,116 +26,177 @@ def _value_for_week(values, week_in_cycle):
     return values[index]
 
 
+@lru_cache(maxsize=8)
+def _read_program_file(path, mtime_ns):
+    """Parse a program JSON file; mtime_ns keys the cache so edits are picked up."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# Fallback program used when the configured JSON file is missing (treat as read-only)
+_DEFAULT_PROGRAM = {
+    "name": "Default 3+1 Program",
+    "description": "Alternating A/B weeks with progressive load and deload.",
+    "cycle_weeks": 4,
+    "weeks": {
+        "A": {
+            "Monday": "strength_day",
+            "Thursday": "upper_pull",
+            "Saturday": "conditioning"
+        },
+        "B": {
+            "Monday": "strength_day",
+            "Thursday": "upper_push",
+            "Saturday": "conditioning"
+        }
+    },
+    "sessions": {
+        "strength_day": {
+            "name": "Lower Body Strength",
+            "description": "Main lower body strength session.",
+            "exercises": [
+                {"name": "Back Squat", "sets": [4, 4, 4, 3], "reps": [6, 5, 4, 6]},
+                {"name": "Romanian Deadlift", "sets": [3, 3, 3, 2], "reps": [8, 8, 6, 8]},
+                {"name": "Split Squat", "sets": [3, 3, 3, 2], "reps": [10, 10, 8, 10]}
+            ]
+        },
+        "upper_pull": {
+            "name": "Upper Pull Focus",
+            "description": "Back and posterior chain accessories.",
+            "exercises": [
+                {"name": "Pull Ups", "sets": [3, 3, 3, 2], "reps": [8, 8, 6, 8]},
+                {"name": "Barbell Row", "sets": [3, 3, 3, 2], "reps": [10, 8, 8, 10]},
+                {"name": "Face Pull", "sets": [3, 3, 3, 2], "reps": [15, 15, 12, 15]}
+            ]
+        },
+        "upper_push": {
+            "name": "Upper Push Focus",
+            "description": "Horizontal and vertical pressing.",
+            "exercises": [
+                {"name": "Bench Press", "sets": [4, 4, 4, 3], "reps": [8, 6, 5, 8]},
+                {"name": "Overhead Press", "sets": [3, 3, 3, 2], "reps": [10, 8, 6, 10]},
+                {"name": "Dip", "sets": [3, 3, 3, 2], "reps": [12, 10, 8, 12]}
+            ]
+        },
+        "conditioning": {
+            "name": "Conditioning & Core",
+            "description": "Light conditioning with core work.",
+            "exercises": [
+                {"name": "Bike Sprint", "sets": [6, 6, 6, 4], "reps": [20, 20, 20, 15]},
+                {"name": "Plank", "sets": [3, 3, 3, 3], "reps": [45, 45, 45, 30]},
+                {"name": "Side Plank", "sets": [2, 2, 2, 2], "reps": [30, 30, 30, 20]}
+            ]
+        }
+    }
+}
+
+
+def get_program_loader(app):
+    """
+    Return the app's shared ProgramLoader, rebuilding it if the JSON file changed.
+    
+    Args:
+        app: Flask application holding the loader in app.extensions
+    
+    Returns:
+        ProgramLoader: Loader reflecting the current program file
+    """
+    loader = app.extensions['program_loader']
+    if loader.is_stale():
+        # Build the replacement fully before swapping it in, so concurrent
+        # requests always see a complete loader
+        loader = ProgramLoader(loader._abs_path)
+        app.extensions['program_loader'] = loader
+    return loader
+
+
 class ProgramLoader:
     """Load and manage workout programs from JSON files."""
     
     def __init__(self, json_path):
         """Initialize the program loader with a JSON file path."""
         self.json_path = json_path
+        # Resolved once so reloads and staleness checks stat the same file
+        self._abs_path = os.path.abspath(json_path)
         self.program = self._load_program()
+        self._weeks = self.program.get('weeks', {})
+        self._sessions = self.program.get('sessions', {})
+        self._splits = self.program.get('splits', {})
+        self._cycle_weeks = self.program.get('cycle_weeks', 4) or 4
         self.uses_session_structure = 'sessions' in self.program and 'weeks' in self.program
+        self._plans = self._precompute_session_plans()
+        self._split_plans = self._precompute_split_plans()
     
     def _load_program(self):
         """Load the program from JSON file."""
         try:
-            with open(self.json_path, 'r') as f:
-                return json.load(f)
+            self._mtime_ns = os.stat(self._abs_path).st_mtime_ns
+            return _read_program_file(self._abs_path, self._mtime_ns)
         except FileNotFoundError:
             # Return a default program structure if file doesn't exist
+            self._mtime_ns = None
+            return self._get_default_program()
+        except ValueError:
+            # Malformed JSON: serve the default program until the file is fixed,
+            # rather than failing every request (or app startup)
+            logger.warning('Could not parse %s; using the default program.', self._abs_path, exc_info=True)
             return self._get_default_program()
     
+    def _current_mtime_ns(self):
+        """Return the JSON file's modification time, or None if it is missing."""
+        try:
+            return os.stat(self._abs_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def is_stale(self):
+        """Check whether the JSON file has changed since this loader read it."""
+        return self._current_mtime_ns() != self._mtime_ns
+    
     def _get_default_program(self):
         """Return a default program structure."""
-        return {
-            "name": "Default 3+1 Program",
-            "description": "Alternating A/B weeks with progressive load and deload.",
-            "cycle_weeks": 4,
-            "weeks": {
-                "A": {
-                    "Monday": "strength_day",
-                    "Thursday": "upper_pull",
-                    "Saturday": "conditioning"
-                },
-                "B": {
-                    "Monday": "strength_day",
-                    "Thursday": "upper_push",
-                    "Saturday": "conditioning"
-                }
-            },
-            "sessions": {
-                "strength_day": {
-                    "name": "Lower Body Strength",
-                    "description": "Main lower body strength session.",
-                    "exercises": [
-                        {"name": "Back Squat", "sets": [4, 4, 4, 3], "reps": [6, 5, 4, 6]},
-                        {"name": "Romanian Deadlift", "sets": [3, 3, 3, 2], "reps": [8, 8, 6, 8]},
-                        {"name": "Split Squat", "sets": [3, 3, 3, 2], "reps": [10, 10, 8, 10]}
-                    ]
-                },
-                "upper_pull": {
-                    "name": "Upper Pull Focus",
-                    "description": "Back and posterior chain accessories.",
-                    "exercises": [
-                        {"name": "Pull Ups", "sets": [3, 3, 3, 2], "reps": [8, 8, 6, 8]},
-                        {"name": "Barbell Row", "sets": [3, 3, 3, 2], "reps": [10, 8, 8, 10]},
-                        {"name": "Face Pull", "sets": [3, 3, 3, 2], "reps": [15, 15, 12, 15]}
-                    ]
-                },
-                "upper_push": {
-                    "name": "Upper Push Focus",
-                    "description": "Horizontal and vertical pressing.",
-                    "exercises": [
-                        {"name": "Bench Press", "sets": [4, 4, 4, 3], "reps": [8, 6, 5, 8]},
-                        {"name": "Overhead Press", "sets": [3, 3, 3, 2], "reps": [10, 8, 6, 10]},
-                        {"name": "Dip", "sets": [3, 3, 3, 2], "reps": [12, 10, 8, 12]}
-                    ]
-                },
-                "conditioning": {
-                    "name": "Conditioning & Core",
-                    "description": "Light conditioning with core work.",
-                    "exercises": [
-                        {"name": "Bike Sprint", "sets": [6, 6, 6, 4], "reps": [20, 20, 20, 15]},
-                        {"name": "Plank", "sets": [3, 3, 3, 3], "reps": [45, 45, 45, 30]},
-                        {"name": "Side Plank", "sets": [2, 2, 2, 2], "reps": [30, 30, 30, 20]}
-                    ]
-                }
-            }
-        }
+        return _DEFAULT_PROGRAM
     
-    def get_program_info(self):
-        """Get basic program information."""
+    @cached_property
+    def program_info(self):
+        """Basic program information, built once per loaded program."""
         return {
             'name': self.program.get('name', 'Unknown Program'),
             'description': self.program.get('description', ''),
-            'cycle_weeks': self.program.get('cycle_weeks', 4)
+            'cycle_weeks': self._cycle_weeks
         }
     
-    def get_split_names(self):
-        """Get the names of available splits."""
+    @cached_property
+    def split_names(self):
+        """Names of the available splits, built once per loaded program."""
         if self.uses_session_structure:
-            weeks = self.program.get('weeks', {})
+            weeks = self._weeks
             return {key: f'Week {key}' for key in weeks.keys()}
 
-        splits = self.program.get('splits', {})
+        splits = self._splits
         return {key: split.get('name', f'Split {key}') for key, split in splits.items()}
 
     def _calculate_cycle_metrics(self, user_start_date):
         """Calculate shared metrics for determining the current program week."""
+        today = datetime.utcnow().date()
         if user_start_date is None:
-            user_start_date = datetime.utcnow().date()
+            user_start_date = today
 
-        today = datetime.utcnow().date()
         days_elapsed = max((today - user_start_date).days, 0)
         weeks_elapsed = days_elapsed // 7
 
-        cycle_weeks = self.program.get('cycle_weeks', 4) or 4
+        cycle_weeks = self._cycle_weeks
         week_in_cycle = (weeks_elapsed % cycle_weeks) + 1
 
         return today, weeks_elapsed, week_in_cycle, cycle_weeks
 
     def _resolve_week_type(self, weeks_elapsed, preferred_split=None):
         """Resolve whether the current schedule follows the A or B template."""
-        if preferred_split and preferred_split in self.program.get('weeks', {}):
+        if preferred_split and preferred_split in self._weeks:
             return preferred_split
 
         return 'A' if weeks_elapsed % 2 == 0 else 'B'
@@ -142,6 +217,49 @@ class ProgramLoader:
 
         return exercises
     
+    def _precompute_session_plans(self):
+        """Build every session's plan for each week of the cycle up front."""
+        plans = {}
+        for session_key, session_data in self._sessions.items():
+            for week_in_cycle in range(1, self._cycle_weeks + 1):
+                plans[(session_key, week_in_cycle)] = self._build_session_plan(session_data, week_in_cycle)
+        return plans
+
+    def _session_plan(self, session_key, session_data, week_in_cycle):
+        """Look up a precomputed session plan, building it for out-of-cycle weeks."""
+        plan = self._plans.get((session_key, week_in_cycle))
+        if plan is None:
+            plan = self._build_session_plan(session_data, week_in_cycle)
+        return plan
+    
+    def _build_split_plan(self, workout_data, week_in_cycle):
+        """Convert a legacy split definition into a concrete workout plan for a specific week."""
+        exercises = []
+        for exercise in workout_data.get('exercises', []):
+            exercises.append({
+                'name': exercise.get('name', 'Exercise'),
+                'sets': _value_for_week(exercise.get('sets', [3, 3, 3, 2]), week_in_cycle),
+                'reps': _value_for_week(exercise.get('reps', [8, 8, 8, 8]), week_in_cycle),
+                'notes': exercise.get('notes', '')
+            })
+
+        return exercises
+
+    def _precompute_split_plans(self):
+        """Build every legacy split's plan for each week of the cycle up front."""
+        plans = {}
+        for split, workout_data in self._splits.items():
+            for week_in_cycle in range(1, self._cycle_weeks + 1):
+                plans[(split, week_in_cycle)] = self._build_split_plan(workout_data, week_in_cycle)
+        return plans
+
+    def _split_plan(self, split, workout_data, week_in_cycle):
+        """Look up a precomputed split plan, building it for out-of-cycle weeks."""
+        plan = self._split_plans.get((split, week_in_cycle))
+        if plan is None:
+            plan = self._build_split_plan(workout_data, week_in_cycle)
+        return plan
+    
     def get_today_workout(self, user_start_date=None, preferred_split=None):
         """
         Determine today's workout based on A/B weekly alternation and 3+1 periodization.
@@ -157,12 +275,12 @@ class ProgramLoader:
 
         if self.uses_session_structure:
             week_type = self._resolve_week_type(weeks_elapsed, preferred_split)
-            day_name = today.strftime('%A')
-            weeks_config = self.program.get('weeks', {})
+            day_name = _DAY_NAMES[today.weekday()]
+            weeks_config = self._weeks
             session_key = weeks_config.get(week_type, {}).get(day_name)
-            session_data = self.program.get('sessions', {}).get(session_key, {}) if session_key else None
+            session_data = self._sessions.get(session_key, {}) if session_key else None
 
-            workout_plan = self._build_session_plan(session_data, week_in_cycle)
+            workout_plan = self._session_plan(session_key, session_data, week_in_cycle)
 
             session_name = session_data.get('name') if session_data else 'Rest Day'
             session_description = session_data.get('description', '') if session_data else ''
@@ -188,21 +306,12 @@ class ProgramLoader:
         else:
             split = 'A' if weeks_elapsed % 2 == 0 else 'B'
 
-        splits = self.program.get('splits', {})
+        splits = self._splits
         if split not in splits:
             split = list(splits.keys())[0] if splits else 'A'
 
         workout_data = splits.get(split, {})
-        exercises = workout_data.get('exercises', [])
-
-        workout_plan = []
-        for exercise in exercises:
-            workout_plan.append({
-                'name': exercise.get('name', 'Exercise'),
-                'sets': _value_for_week(exercise.get('sets', [3, 3, 3, 2]), week_in_cycle),
-                'reps': _value_for_week(exercise.get('reps', [8, 8, 8, 8]), week_in_cycle),
-                'notes': exercise.get('notes', '')
-            })
+        workout_plan = self._split_plan(split, workout_data, week_in_cycle)
 
         return {
             'split': split,
@@ -224,21 +333,12 @@ class ProgramLoader:
         if self.uses_session_structure:
             return self.get_session_workout(split, day_name=day_name, week_in_cycle=week_in_cycle)
 
-        splits = self.program.get('splits', {})
+        splits = self._splits
         if split not in splits:
             return None
 
         workout_data = splits.get(split, {})
-        exercises = workout_data.get('exercises', [])
-
-        workout_plan = []
-        for exercise in exercises:
-            workout_plan.append({
-                'name': exercise.get('name', 'Exercise'),
-                'sets': _value_for_week(exercise.get('sets', [3, 3, 3, 2]), week_in_cycle),
-                'reps': _value_for_week(exercise.get('reps', [8, 8, 8, 8]), week_in_cycle),
-                'notes': exercise.get('notes', '')
-            })
+        workout_plan = self._split_plan(split, workout_data, week_in_cycle)
 
         return {
             'split': split,
@@ -253,8 +353,8 @@ class ProgramLoader:
         if not self.uses_session_structure:
             return self.get_split_workout(week_type, week_in_cycle)
 
-        weeks_config = self.program.get('weeks', {})
-        sessions = self.program.get('sessions', {})
+        weeks_config = self._weeks
+        sessions = self._sessions
         schedule = weeks_config.get(week_type, {})
 
         if day_name is None:
@@ -266,14 +366,14 @@ class ProgramLoader:
                     'session_key': session_key,
                     'session_name': session_data.get('name', session_key),
                     'session_description': session_data.get('description', ''),
-                    'exercises': self._build_session_plan(session_data, week_in_cycle),
+                    'exercises': self._session_plan(session_key, session_data, week_in_cycle),
                     'is_rest_day': session_key is None
                 })
 
             return {
                 'week_type': week_type,
                 'week_in_cycle': week_in_cycle,
-                'cycle_weeks': self.program.get('cycle_weeks', 4),
+                'cycle_weeks': self._cycle_weeks,
                 'days': days
             }
 
@@ -288,6 +388,6 @@ class ProgramLoader:
             'session_description': session_data.get('description', '') if session_data else '',
             'week_in_cycle': week_in_cycle,
             'is_rest_day': session_key is None,
-            'cycle_weeks': self.program.get('cycle_weeks', 4),
-            'exercises': self._build_session_plan(session_data, week_in_cycle)
+            'cycle_weeks': self._cycle_weeks,
+            'exercises': self._session_plan(session_key, session_data, week_in_cycle)
         }
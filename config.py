@@ -10,6 +10,20 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///workout_tracker.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Run db.create_all() on startup; set to false in production to skip schema introspection
+    AUTO_CREATE_TABLES = os.environ.get('AUTO_CREATE_TABLES', 'true').lower() in ['true', 'on', '1']
+    
+    # Connection pool tuning - LIFO reuse lets idle overflow connections expire.
+    # create_app drops these for in-memory SQLite, which uses a single static connection.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+    }
+    
     # Session configuration - remember users for 3 days
     PERMANENT_SESSION_LIFETIME = timedelta(days=3)
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'false').lower() in ['true', 'on', '1']
@@ -18,3 +32,21 @@ class Config:
     
     # Program JSON file path
     PROGRAM_JSON_PATH = os.environ.get('PROGRAM_JSON_PATH') or 'program.json'
+    
+    # Development N+1 query detection (requires the nplusone package)
+    NPLUSONE_ENABLED = os.environ.get('NPLUSONE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    
+    # Development endpoint profiling (requires the flask-profiler package)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() in ['true', 'on', '1']
+    FLASK_PROFILER = {
+        'enabled': PROFILER_ENABLED,
+        'storage': {'engine': 'sqlite'},
+        'basicAuth': {
+            'enabled': True,
+            'username': os.environ.get('PROFILER_USERNAME'),
+            'password': os.environ.get('PROFILER_PASSWORD')
+        },
+        # Profiled requests are stored with their form data and headers (the Cookie header
+        # is dropped in create_app), so keep this to development and never record the auth routes
+        'ignore': ['^/static/.*', '^/auth/.*']
+    }